@@ -1,7 +1,7 @@
 from ..utils import BaseIO
 from ase.calculators.calculator import Calculator, all_changes
 from copy import deepcopy
-from ..neighbourlist.structure_manager import AtomsList, unpack_ase
+from ..neighbourlist.structure_manager import AtomsList, unpack_ase, wrap_structures
 
 
 class ASEMLCalculator(Calculator, BaseIO):
@@ -42,7 +42,7 @@ class ASEMLCalculator(Calculator, BaseIO):
         if self.manager is None:
             #  happens at the begining of the MD run
             at = self.atoms.copy()
-            at.wrap(eps=1e-11)
+            wrap_structures([at])
             self.manager = [at]
         elif isinstance(self.manager, AtomsList):
             structure = unpack_ase(self.atoms, wrap_pos=True)
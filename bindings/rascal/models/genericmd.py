@@ -3,7 +3,7 @@ import ase.io
 import numpy as np
 
 from ..utils import BaseIO, load_obj
-from ..neighbourlist.structure_manager import AtomsList, unpack_ase
+from ..neighbourlist.structure_manager import AtomsList, unpack_ase, wrap_structures
 
 
 class GenericMDCalculator:
@@ -111,7 +111,7 @@ class GenericMDCalculator:
         if self.manager is None:
             #  happens at the begining of the MD run
             at = self.atoms.copy()
-            at.wrap(eps=1e-11)
+            wrap_structures([at])
             self.manager = [at]
         elif isinstance(self.manager, AtomsList):
             structure = unpack_ase(self.atoms, wrap_pos=True)
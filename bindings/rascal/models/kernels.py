@@ -111,7 +111,9 @@ class Kernel(BaseIO):
     def _get_data(self):
         return super()._get_data()
 
-    def __call__(self, X, Y=None, grad=(False, False), compute_neg_stress=False):
+    def __call__(
+        self, X, Y=None, grad=(False, False), compute_neg_stress=False, both=False
+    ):
         """
         Compute the kernel.
 
@@ -131,12 +133,33 @@ class Kernel(BaseIO):
             compute_neg_stress : if gradients are computed and True then compute
                 also the kernel associated with the stress in Voigt format.
 
+            both : if True then return the tuple of the kernel and its
+                gradient w.r.t. the atomic positions of the 1st argument
+                (only defined for sparse kernels). Both evaluations share
+                the already computed representation; this is also the
+                single place where a fused evaluation of the two common
+                sparse-point inner products can be plugged in.
+
         Returns
         -------
             kernel_matrix: ndarray
         """
         if isinstance(X, AtomsList):
             X = X.managers
+        if both:
+            if "Sparse" not in self.kernel_type:
+                raise NotImplementedError(
+                    "both=True is only defined for sparse kernels"
+                )
+            return (
+                self(X, Y, grad=(False, False)),
+                self(
+                    X,
+                    Y,
+                    grad=(True, False),
+                    compute_neg_stress=compute_neg_stress,
+                ),
+            )
         if Y is None and grad == (False, False):
             # compute a kernel between features and themselves
             if self.kernel_type == "Full":
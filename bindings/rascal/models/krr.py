@@ -12,6 +12,51 @@ from ..lib import compute_sparse_kernel_gradients, compute_sparse_kernel_neg_str
 
 import numpy as np
 import ase
+from scipy.linalg import cho_factor, cho_solve, lstsq
+from scipy.linalg.blas import dgemv, dsyrk
+
+# number of gradient rows of KNM processed at once when assembling the
+# normal equations in train_gap_model; keeps the scaled tile (roughly
+# tile size x M doubles) small enough to stay cache resident between the
+# scaling and the syrk/matvec passes
+_GRAD_TILE_SIZE = 4096
+
+
+def _species_contribution_lookup(self_contributions):
+    """Dense array mapping atomic number -> property baseline, suitable
+    for _get_energy_baseline."""
+    lookup = np.zeros(max(self_contributions) + 1)
+    for species, contribution in self_contributions.items():
+        lookup[species] = contribution
+    return lookup
+
+
+def _get_energy_baseline(atomic_numbers, self_contributions, lookup=None):
+    """Sum the per-species property baselines of one structure.
+
+    Parameters
+    ----------
+    atomic_numbers : np.array(int)
+        atomic numbers of the structure
+    self_contributions : dictionary
+        map atomic number to the property baseline
+    lookup : np.array, optional
+        dense contribution-by-atomic-number array built with
+        _species_contribution_lookup; pass it when calling in a loop so
+        it is built only once
+
+    The baseline reduces to one bincount of the atomic numbers and one
+    small dot product instead of per-atom (or per-species) dict lookups.
+    """
+    if lookup is None:
+        lookup = _species_contribution_lookup(self_contributions)
+    counts = np.bincount(atomic_numbers, minlength=lookup.size)
+    # species without a self contribution are still an error, as with
+    # the former per-species dict lookup
+    for species in np.flatnonzero(counts):
+        if species not in self_contributions:
+            raise KeyError(species)
+    return float(np.dot(counts[: lookup.size], lookup))
 
 
 class KRR(BaseIO):
@@ -69,14 +114,15 @@ class KRR(BaseIO):
         """build total baseline contribution for each prediction"""
         if self.target_type == "Structure":
             Y0 = np.zeros(len(managers))
+            lookup = _species_contribution_lookup(self.self_contributions)
             for i_manager, manager in enumerate(managers):
                 if isinstance(manager, ase.Atoms):
                     numbers = manager.get_atomic_numbers()
-                    for sp in numbers:
-                        Y0[i_manager] += self.self_contributions[sp]
                 else:
-                    for at in manager:
-                        Y0[i_manager] += self.self_contributions[at.atom_type]
+                    numbers = np.array([at.atom_type for at in manager])
+                Y0[i_manager] = _get_energy_baseline(
+                    numbers, self.self_contributions, lookup
+                )
         elif self.target_type == "Atom":
             n_centers = 0
             for manager in managers:
@@ -289,12 +335,11 @@ def _compute_kernel_single(i_frame, frame, representation, X_sparse, kernel):
         Gradient of the kernel
     """
     feat = representation.transform([frame])
-    en_row = kernel(feat, X_sparse)
-    grad_rows = kernel(feat, X_sparse, grad=(True, False))
+    en_row, grad_rows = kernel(feat, X_sparse, both=True)
     return en_row, grad_rows
 
 
-def compute_KNM(frames, X_sparse, kernel, soap):
+def compute_KNM(frames, X_sparse, kernel, soap, filename=None):
     """Compute GAP kernel of the (new) structures against the sparse points
 
     Parameters
@@ -307,6 +352,12 @@ def compute_KNM(frames, X_sparse, kernel, soap):
         Sparse points to compute kernels against
     kernel
         Kernel object to use
+    filename : string, optional
+        name of a '.npy' file to stream the kernel to. The kernel is
+        then backed by a memory-mapped array whose rows are written out
+        as the structures are processed, so the full matrix never has to
+        be held in RAM (the gradient rows alone can reach several GB for
+        large training sets). The returned array is the memory map.
 
     Returns
     -------
@@ -337,13 +388,23 @@ def compute_KNM(frames, X_sparse, kernel, soap):
         Nstructures, Ngrads, Ngrad_stride = _get_kernel_strides(frames.iterable)
     else:
         Nstructures, Ngrads, Ngrad_stride = _get_kernel_strides(frames)
-    KNM = np.zeros((Nstructures + Ngrads, X_sparse.size()))
+    if filename is None:
+        KNM = np.zeros((Nstructures + Ngrads, X_sparse.size()))
+    else:
+        KNM = np.lib.format.open_memmap(
+            filename,
+            mode="w+",
+            dtype=np.float64,
+            shape=(Nstructures + Ngrads, X_sparse.size()),
+        )
     for i_frame, frame in enumerate(frames):
         en_row, grad_rows = _compute_kernel_single(
             i_frame, frame, soap, X_sparse, kernel
         )
         KNM[Ngrad_stride[i_frame] : Ngrad_stride[i_frame + 1]] = grad_rows
         KNM[i_frame] = en_row
+    if filename is not None:
+        KNM.flush()
     return KNM
 
 
@@ -440,34 +501,84 @@ def train_gap_model(
         https://doi.org/10.1007/978-3-319-42913-7_68-1
     """
     KMM = kernel(X_sparse)
-    Y = y_train.reshape((-1, 1)).copy()
-    KNM = KNM_.copy()
+    Y = y_train.reshape((-1, 1))
     n_centers = Y.shape[0]
     Natoms = np.zeros(n_centers)
     Y0 = np.zeros((n_centers, 1))
+    # single pass over the training structures filling the preallocated
+    # arrays, fetching the atomic numbers of each structure only once
+    lookup = _species_contribution_lookup(self_contributions)
     for iframe, frame in enumerate(frames):
-        Natoms[iframe] = len(frame)
-        for sp in frame.get_atomic_numbers():
-            Y0[iframe] += self_contributions[sp]
+        atomic_numbers = frame.get_atomic_numbers()
+        Natoms[iframe] = atomic_numbers.size
+        Y0[iframe] = _get_energy_baseline(atomic_numbers, self_contributions, lookup)
     Y = Y - Y0
     delta = np.std(Y)
+    # The normal equations are assembled block-wise from the property
+    # and gradient rows of KNM_, so the stacked kernel matrix is neither
+    # copied nor modified and Y never has to be vstacked with the
+    # gradient targets. KNM.T @ KNM is symmetric so let BLAS (syrk) fill
+    # only the upper triangle, halving the FLOPs of the dominant product.
     # lambdas[0] is provided per atom hence the '* np.sqrt(Natoms)'
-    # the first n_centers rows of KNM are expected to refer to the
+    # the first n_centers rows of KNM_ are expected to refer to the
     #  property
-    KNM[:n_centers] /= lambdas[0] / delta * np.sqrt(Natoms)[:, None]
-    Y /= lambdas[0] / delta * np.sqrt(Natoms)[:, None]
+    energy_regularizer = lambdas[0] / delta * np.sqrt(Natoms)[:, None]
+    KNM_energy = KNM_[:n_centers] / energy_regularizer
+    Y = Y / energy_regularizer
+    G = dsyrk(1.0, KNM_energy, trans=1)
+    # KNM.T @ Y is a matrix-vector product, so dispatch it explicitly to
+    # BLAS-2 gemv and later accumulate the gradient tiles into rhs with
+    # beta=1 instead of allocating a temporary per tile
+    rhs = dgemv(1.0, KNM_energy, Y[:, 0], trans=1)
 
     if grad_train is not None:
-        KNM[n_centers:] /= lambdas[1] / delta
-        F = grad_train.reshape((-1, 1)).copy()
-        F /= lambdas[1] / delta
-        Y = np.vstack([Y, F])
+        # scale the gradient targets in a single multiplication pass
+        # instead of copying them and dividing in place
+        grad_regularizer = delta / lambdas[1]
+        F = grad_train.reshape((-1, 1)) * grad_regularizer
+        # scale and accumulate the gradient rows tile by tile instead of
+        # materializing the full scaled 3*Natoms x M block at once
+        n_grad_rows = KNM_.shape[0] - n_centers
+        for i_row in range(0, n_grad_rows, _GRAD_TILE_SIZE):
+            KNM_grad = (
+                KNM_[n_centers + i_row : n_centers + i_row + _GRAD_TILE_SIZE]
+                * grad_regularizer
+            )
+            G = dsyrk(1.0, KNM_grad, beta=1.0, c=G, trans=1, overwrite_c=1)
+            rhs = dgemv(
+                1.0,
+                KNM_grad,
+                F[i_row : i_row + _GRAD_TILE_SIZE, 0],
+                beta=1.0,
+                y=rhs,
+                trans=1,
+                overwrite_y=1,
+            )
+
+    # back to the column-vector shape expected from the solve
+    rhs = rhs.reshape((-1, 1))
 
     KMM[np.diag_indices_from(KMM)] += jitter
 
-    K = KMM + np.dot(KNM.T, KNM)
-    Y = np.dot(KNM.T, Y)
-    weights = np.linalg.lstsq(K, Y, rcond=None)[0]
+    K = KMM + np.triu(G) + np.triu(G, 1).T
+    # K is symmetric positive definite up to round-off, so a Cholesky
+    # factorization solves the system at a third of the cost of the SVD
+    # done by lstsq; fall back to lstsq if the jitter was not enough to
+    # keep K numerically positive definite
+    try:
+        weights = cho_solve(cho_factor(K), rhs)
+    except np.linalg.LinAlgError:
+        # K and rhs are not needed afterwards, so let LAPACK work in
+        # place; the QR-based gelsy driver also avoids the SVD done by
+        # the default gelsd
+        weights = lstsq(
+            K,
+            rhs,
+            overwrite_a=True,
+            overwrite_b=True,
+            check_finite=False,
+            lapack_driver="gelsy",
+        )[0]
     model = KRR(weights, kernel, X_sparse, self_contributions)
 
     # avoid memory clogging
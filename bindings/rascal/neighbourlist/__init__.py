@@ -2,4 +2,5 @@ from .structure_manager import (
     AtomsList,
     get_neighbourlist,
     convert_to_structure_list,
+    wrap_structures,
 )
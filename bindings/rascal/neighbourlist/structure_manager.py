@@ -308,6 +308,29 @@ def is_ase_Atoms(frame):
     return is_ase
 
 
+def wrap_structures(frames, eps=1e-11):
+    """Wrap the atoms of several structures back into their unit cell
+
+    Parameters
+    ----------
+    frames : list(ase.Atoms)
+        Atomic structures, modified in place
+
+    eps : float
+        small number to prevent slightly negative coordinates from being
+        wrapped
+
+    Lighter replacement for calling ase.Atoms.wrap on every structure:
+    the positions of each structure are wrapped with a single vectorized
+    wrap_positions call written directly into the position array,
+    skipping the per-call argument handling of ase.Atoms.wrap.
+    """
+    for frame in frames:
+        frame.positions[:] = wrap_positions(
+            frame.positions, frame.get_cell(), frame.get_pbc(), eps=eps
+        )
+
+
 def unpack_ase(frame, wrap_pos=False):
     """
     Convert ASE Atoms object to rascal's equivalent
@@ -32,6 +32,7 @@ import benchmarks
 try:
     from rascal.representations import SphericalInvariants
     from rascal.representations import SphericalExpansion
+    from rascal.neighbourlist import wrap_structures
 except ImportError:
     sys.exit("Could not import rascal.")
 
@@ -115,8 +116,7 @@ def benchmark_spherical_representations(frames, optimization_args, radial_basis)
 if __name__ == "__main__":
     for input_file in input_files:
         frames = read(input_file, index=":")
-        for i in range(len(frames)):
-            frames[i].wrap(eps=1e-11)
+        wrap_structures(frames)
         for radial_basis in radial_bases:
             for optimization_args in optimizations_args:
                 print(
@@ -2,16 +2,24 @@ import sys
 import os
 import json
 import argparse
+import multiprocessing
 import numpy as np
 import ubjson
 import json
 from scipy.special import sph_harm, lpmn
 from mpmath import mp, spherharm
 import mpmath
-from functools import reduce
+from functools import partial, reduce
+
+try:
+    import numba
+except ImportError:
+    numba = None
 
 # shape (nb_unit_vectors,3)
 
+SQRT2 = np.sqrt(2.0)
+
 root = os.path.abspath("../")
 rascal_reference_path = os.path.join(root, "reference_data/")
 inputs_path = os.path.join(rascal_reference_path, "tests_only")
@@ -51,14 +59,168 @@ def get_ascending_angular_lists(max_angular_l):
 # https://en.wikipedia.org/wiki/Spherical_harmonics#Real_form
 
 
+def get_alp_recurrence_coefficients(max_angular_l):
+    """Coefficients a_{l,m}, b_{l,m} of the three-term recurrence
+    P_{l,m} = a_{l,m} (cos(theta) P_{l-1,m} - b_{l,m} P_{l-2,m})
+    for the fully normalized associated Legendre polynomials.
+    Only the entries with m < l are meaningful (the rest are nan)."""
+    ls = np.arange(max_angular_l + 1, dtype=np.float64)[:, None]
+    ms = np.arange(max_angular_l + 1, dtype=np.float64)[None, :]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        a_coeffs = np.sqrt((4 * ls ** 2 - 1) / (ls ** 2 - ms ** 2))
+        b_coeffs = np.sqrt(((ls - 1) ** 2 - ms ** 2) / (4 * (ls - 1) ** 2 - 1))
+    return a_coeffs, b_coeffs
+
+
+def _real_sph_all(unit_vector, max_angular_l, a_coeffs, b_coeffs, harmonics):
+    """Scalar-loop version of the recurrence in compute_real_sph filling
+    the preallocated harmonics array; compiled with numba when it is
+    available so the recurrence state stays in registers instead of
+    NumPy temporaries."""
+    cos_theta = unit_vector[2]
+    sin_theta = np.sqrt(1.0 - cos_theta ** 2)
+    phi = np.arctan2(unit_vector[1], unit_vector[0])
+    alp = np.zeros((max_angular_l + 1, max_angular_l + 1))
+    alp[0, 0] = np.sqrt(1.0 / (4.0 * np.pi))
+    for m in range(1, max_angular_l + 1):
+        alp[m, m] = (
+            -np.sqrt((2.0 * m + 1.0) / (2.0 * m)) * sin_theta * alp[m - 1, m - 1]
+        )
+    for m in range(max_angular_l):
+        alp[m + 1, m] = np.sqrt(2.0 * m + 3.0) * cos_theta * alp[m, m]
+    for l in range(2, max_angular_l + 1):
+        for m in range(l - 1):
+            alp[l, m] = a_coeffs[l, m] * (
+                cos_theta * alp[l - 1, m] - b_coeffs[l, m] * alp[l - 2, m]
+            )
+
+    sqrt2 = np.sqrt(2.0)
+    for l in range(max_angular_l + 1):
+        i_lm0 = l * l + l
+        harmonics[i_lm0] = alp[l, 0]
+        phase = -1.0
+        for m in range(1, l + 1):
+            harmonics[i_lm0 - m] = phase * sqrt2 * alp[l, m] * np.sin(m * phi)
+            harmonics[i_lm0 + m] = phase * sqrt2 * alp[l, m] * np.cos(m * phi)
+            phase = -phase
+
+
+if numba is not None:
+    _real_sph_all = numba.njit(cache=True, fastmath=True)(_real_sph_all)
+
+
+def compute_real_sph(unit_vector, max_angular_l, recurrence_coefficients=None):
+    """Compute all real spherical harmonics up to max_angular_l for one
+    direction, in the compressed (l,m) format described above.
+
+    Instead of one scipy call per (l,m), the fully normalized associated
+    Legendre polynomials P_l^m(cos(theta)) (including the Condon-Shortley
+    phase) are built with the standard forward recurrences
+        P_{m,m} = -sqrt((2m+1)/(2m)) sin(theta) P_{m-1,m-1}
+        P_{m+1,m} = sqrt(2m+3) cos(theta) P_{m,m}
+        P_{l,m} = a_{l,m} (cos(theta) P_{l-1,m} - b_{l,m} P_{l-2,m})
+    and combined with precomputed cos(m phi), sin(m phi) arrays, so the
+    whole (max_angular_l+1)**2 table is a handful of NumPy array
+    operations."""
+    cos_theta = unit_vector[2]
+    sin_theta = np.sqrt(1.0 - cos_theta ** 2)
+    phi = np.arctan2(unit_vector[1], unit_vector[0])
+    if recurrence_coefficients is None:
+        recurrence_coefficients = get_alp_recurrence_coefficients(max_angular_l)
+    a_coeffs, b_coeffs = recurrence_coefficients
+
+    if numba is not None:
+        # the jit-compiled scalar loops beat the NumPy version for the
+        # small tables used here (fancy-indexing temporaries dominate)
+        harmonics = np.empty((max_angular_l + 1) ** 2)
+        _real_sph_all(
+            np.asarray(unit_vector, dtype=np.float64),
+            max_angular_l,
+            a_coeffs,
+            b_coeffs,
+            harmonics,
+        )
+        return harmonics
+
+    alp = np.zeros((max_angular_l + 1, max_angular_l + 1))
+    alp[0, 0] = np.sqrt(1.0 / (4.0 * np.pi))
+    for m in range(1, max_angular_l + 1):
+        alp[m, m] = (
+            -np.sqrt((2.0 * m + 1.0) / (2.0 * m)) * sin_theta * alp[m - 1, m - 1]
+        )
+    for m in range(max_angular_l):
+        alp[m + 1, m] = np.sqrt(2.0 * m + 3.0) * cos_theta * alp[m, m]
+    for l in range(2, max_angular_l + 1):
+        alp[l, : l - 1] = a_coeffs[l, : l - 1] * (
+            cos_theta * alp[l - 1, : l - 1] - b_coeffs[l, : l - 1] * alp[l - 2, : l - 1]
+        )
+
+    angular_ms = np.arange(max_angular_l + 1)
+    cos_mphi = np.cos(angular_ms * phi)
+    sin_mphi = np.sin(angular_ms * phi)
+    # (-1)^m sqrt(2) factors of the real form (see comment above)
+    phases = SQRT2 * (-1.0) ** angular_ms
+
+    harmonics = np.zeros((max_angular_l + 1) ** 2)
+    for angular_l in range(max_angular_l + 1):
+        i_lm0 = angular_l * angular_l + angular_l
+        pos_ms = angular_ms[1 : angular_l + 1]
+        harmonics[i_lm0] = alp[angular_l, 0]
+        harmonics[i_lm0 - pos_ms] = (
+            phases[pos_ms] * alp[angular_l, pos_ms] * sin_mphi[pos_ms]
+        )
+        harmonics[i_lm0 + pos_ms] = (
+            phases[pos_ms] * alp[angular_l, pos_ms] * cos_mphi[pos_ms]
+        )
+    return harmonics
+
+
+def compute_real_sph_scipy(unit_vectors, max_angular_l):
+    """Real spherical harmonics of all directions at once using scipy.
+
+    Batches the directions so that sph_harm is called once per (l,m)
+    with vector phi/theta arguments instead of once per (l,m) per
+    direction; serves as an independent reference for the recurrence in
+    compute_real_sph. Returns an array of shape
+    (n_directions, (max_angular_l+1)**2) in the compressed (l,m)
+    format."""
+    unit_vectors = np.asarray(unit_vectors)
+    theta = np.arccos(unit_vectors[:, 2])
+    phi = np.arctan2(unit_vectors[:, 1], unit_vectors[:, 0])
+    harmonics = np.empty((unit_vectors.shape[0], (max_angular_l + 1) ** 2))
+    for angular_l in range(max_angular_l + 1):
+        i_lm0 = angular_l * angular_l + angular_l
+        harmonics[:, i_lm0] = np.real(sph_harm(0, angular_l, phi, theta))
+        for angular_m in range(1, angular_l + 1):
+            # Y_l^{-m} = (-1)^m conj(Y_l^m), so a single scipy call
+            # serves both the +m and the -m entry
+            values = sph_harm(angular_m, angular_l, phi, theta)
+            phase = (-1) ** angular_m
+            harmonics[:, i_lm0 - angular_m] = phase * SQRT2 * np.imag(values)
+            harmonics[:, i_lm0 + angular_m] = phase * SQRT2 * np.real(values)
+    return harmonics
+
+
+def _one_direction(unit_vector, l_max, recurrence_coefficients, alp_normfacts):
+    """Per-direction numeric payload of dump_reference_json, run in a
+    pool worker; returns one row of harmonics and one (flattened) row of
+    normalized associated Legendre values."""
+    cos_theta = unit_vector[2]
+    harmonics = compute_real_sph(unit_vector, l_max, recurrence_coefficients)
+
+    # Calculating the associated Legendre polynomials; a single lpmn
+    # call returns the whole (m,l) table (this is also the formula
+    # documented in tests/test_math_spherical_harmonics.cc)
+    alps = lpmn(l_max, l_max, cos_theta)[0].T * alp_normfacts
+    return harmonics, alps.reshape(-1)
+
+
 def dump_reference_json():
     # to produces more readable tests use l_max 2 or 3
     verbose = False
     l_max = 30
     sys.path.insert(0, os.path.join(root, "build/"))
     sys.path.insert(0, os.path.join(root, "tests/"))
-    data = []
-    mp.dps = 200
 
     # Calculation of spherical harmonics
     # with mpmath:
@@ -86,53 +248,65 @@ def dump_reference_json():
         print("alp_normfacts")
         print(alp_normfacts)
 
-    for unit_vector in unit_vectors:
-        # Calculating the spherical harmonics
-
-        harmonics = []
-        # copy of c++ code:
-        # double cos_theta = unit_vector[2];
-        cos_theta = unit_vector[2]
-        theta = np.arccos(cos_theta)
-        # copy of c++ code:
-        # double phi = std::atan2(unit_vector[1], unit_vector[0]);
-        phi = np.arctan2(unit_vector[1], unit_vector[0])
-        if verbose:
-            print(unit_vector)
-        for l in range(l_max + 1):
-
-            # calculation for negative m
-            for m in range(-l, 0):
-                result = (
-                    (-1) ** m * np.sqrt(2) * np.imag(sph_harm(np.abs(m), l, phi, theta))
-                )
-                harmonics.append(float(result))
-                if verbose:
-                    print(l, m, result)
-            # calculation for m=0
-            result = np.real(sph_harm(0, l, phi, theta))
-            harmonics.append(float(result))
-            if verbose:
-                print(l, 0, result)
-            # calculation for positive m
-            for m in range(1, l + 1):
-                result = (-1) ** m * np.sqrt(2) * np.real(sph_harm(m, l, phi, theta))
-            print(alps)
-        alps *= alp_normfacts
-        if verbose:
-            print("alps")
-            print(alps)
-        alps = list(map(float, alps.reshape(-1).tolist()))
-        data.append(
-            dict(
-                max_angular_l=int(l_max),
-                unit_vector=unit_vector,
-                harmonics=harmonics,
-                alps=alps,
-            )
+    recurrence_coefficients = get_alp_recurrence_coefficients(l_max)
+
+    # cross-check the recurrence against the batched scipy reference
+    np.testing.assert_allclose(
+        np.array(
+            [
+                compute_real_sph(unit_vector, l_max, recurrence_coefficients)
+                for unit_vector in unit_vectors
+            ]
+        ),
+        compute_real_sph_scipy(unit_vectors, l_max),
+        atol=1e-13,
+    )
+
+    # the numeric payload goes into preallocated contiguous buffers (one
+    # row per direction) instead of per-direction dicts of boxed floats
+    n_directions = len(unit_vectors)
+    harmonics_out = np.empty((n_directions, (l_max + 1) ** 2))
+    alps_out = np.empty((n_directions, (l_max + 1) ** 2))
+
+    # the directions are independent of each other, so fan the
+    # per-direction work out over all available cores
+    with multiprocessing.Pool(os.cpu_count()) as pool:
+        results = pool.imap(
+            partial(
+                _one_direction,
+                l_max=l_max,
+                recurrence_coefficients=recurrence_coefficients,
+                alp_normfacts=alp_normfacts,
+            ),
+            unit_vectors,
+            chunksize=4,
         )
+        for i_direction, (harmonics, alps) in enumerate(results):
+            harmonics_out[i_direction] = harmonics
+            alps_out[i_direction] = alps
     if verbose:
-        print(len(data))
+        print(n_directions)
+    # the numeric payload is also dumped as a binary npz: one contiguous
+    # write per array instead of serializing every float through the
+    # pure-Python ubjson encoder
+    np.savez_compressed(
+        os.path.join(root, dump_path, "spherical_harmonics_reference.npz"),
+        max_angular_l=l_max,
+        unit_vectors=np.asarray(unit_vectors),
+        harmonics=harmonics_out,
+        alps=alps_out,
+    )
+    # the ubjson file stays the format read by the C++ tests, so the
+    # per-direction dicts are only materialized here at dump time
+    data = [
+        dict(
+            max_angular_l=int(l_max),
+            unit_vector=unit_vector,
+            harmonics=harmonics_out[i_direction].tolist(),
+            alps=alps_out[i_direction].tolist(),
+        )
+        for i_direction, unit_vector in enumerate(unit_vectors)
+    ]
     with open(
         os.path.join(root, dump_path, "spherical_harmonics_reference.ubjson"),
         "wb",
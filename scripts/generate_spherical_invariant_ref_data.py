@@ -5,6 +5,7 @@ import ase
 import json
 import sys
 import os
+import threading
 
 sys.path.insert(0, "../build/")
 
@@ -127,6 +128,16 @@ def dump_reference_json():
 #############################################################################
 
 
+def _async_save(path, array):
+    """Write array with np.save on a background thread.
+
+    np.save releases the GIL while writing, so the next feature/kernel
+    computation can proceed while the previous kernel streams to disk."""
+    thread = threading.Thread(target=np.save, args=(path, array))
+    thread.start()
+    return thread
+
+
 def main(json_dump, save_kernel):
 
     nmax = 9
@@ -146,6 +157,7 @@ def main(json_dump, save_kernel):
     lmax = test_hypers["max_angular"]
     nstr = "2"  # number of structures
 
+    save_threads = []
     frames = read(os.path.join(inputs_path, "small_molecules-20.json"), ":" + str(nstr))
     species = set([atom for frame in frames for atom in frame.get_atomic_numbers()])
     nspecies = len(species)
@@ -158,7 +170,11 @@ def main(json_dump, save_kernel):
     x = get_feature_vector(test_hypers, frames)
     kernel = np.dot(x, x.T)
     if save_kernel is True:
-        np.save(os.path.join(dump_path, "kernel_soap_example_nu1.npy"), kernel)
+        save_threads.append(
+            _async_save(
+                os.path.join(dump_path, "kernel_soap_example_nu1.npy"), kernel
+            )
+        )
 
     # ------------------------------------------nu=2------------------------------#
 
@@ -166,7 +182,11 @@ def main(json_dump, save_kernel):
     x = get_feature_vector(test_hypers, frames)
     kernel = np.dot(x, x.T)
     if save_kernel is True:
-        np.save(os.path.join(dump_path, "kernel_soap_example_nu2.npy"), kernel)
+        save_threads.append(
+            _async_save(
+                os.path.join(dump_path, "kernel_soap_example_nu2.npy"), kernel
+            )
+        )
 
     # ------------------------------------------nu=3-----------------------------#
 
@@ -183,13 +203,20 @@ def main(json_dump, save_kernel):
     x = get_feature_vector(test_hypers, frames)
     kernel = np.dot(x, x.T)
     if save_kernel is True:
-        np.save(os.path.join(dump_path, "kernel_soap_example_nu3.npy"), kernel)
+        save_threads.append(
+            _async_save(
+                os.path.join(dump_path, "kernel_soap_example_nu3.npy"), kernel
+            )
+        )
 
     # ------------------dump json reference data--------------------------------#
 
     if json_dump == True:
         dump_reference_json()
 
+    for thread in save_threads:
+        thread.join()
+
 
 ##############################################################################
 